@@ -175,8 +175,7 @@ class SegmentAPI(ServerAPI):
 
         if created:
             segments = self._manager.create_segments(coll)
-            for segment in segments:
-                self._sysdb.create_segment(segment)
+            self._sysdb.create_segments(segments)
 
         # TODO: This event doesn't capture the get_or_create case appropriately
         self._product_telemetry_client.capture(
@@ -115,6 +115,11 @@ class Settings(BaseSettings):  # type: ignore
 
     is_persistent: bool = False
     persist_directory: str = "./chroma"
+    # Use SQLite's write-ahead log for persistent databases, so that reads don't block
+    # on writes. The journal mode is stored in the database file (which then has -wal
+    # and -shm files next to it), the persist_directory must be on a local filesystem,
+    # and the last commits before a power loss or OS crash may not be durable.
+    sqlite_wal: bool = False
 
     chroma_server_host: Optional[str] = None
     chroma_server_headers: Optional[Dict[str, str]] = None
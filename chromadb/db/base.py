@@ -1,4 +1,4 @@
-from typing import Any, Optional, Sequence, Tuple, Type
+from typing import Any, Iterator, Optional, Sequence, Tuple, Type
 from types import TracebackType
 from typing_extensions import Protocol, Self, Literal
 from abc import ABC, abstractmethod
@@ -40,10 +40,23 @@ class Cursor(Protocol):
     def fetchone(self) -> Tuple[Any, ...]:
         ...
 
+    def fetchmany(self, size: int = ...) -> Sequence[Tuple[Any, ...]]:
+        ...
+
     def fetchall(self) -> Sequence[Tuple[Any, ...]]:
         ...
 
 
+def iter_rows(cur: Cursor, batch_size: int = 1024) -> Iterator[Tuple[Any, ...]]:
+    """Iterate over the result rows of the cursor's last query, fetching them from the
+    driver in batches of batch_size instead of materializing them all at once."""
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
 class TxWrapper(ABC, EnforceOverrides):
     """Wrapper class for DBAPI 2.0 Connection objects, with which clients can implement transactions.
     Makes two guarantees that basic DBAPI 2.0 connections do not:
@@ -113,6 +126,14 @@ class SqlDB(Component):
         violated"""
         pass
 
+    def metadata_json_sql(self, table: str, id_col: str, parent: str) -> Optional[str]:
+        """Return a correlated subquery selecting the metadata rows of the given
+        metadata table for the parent table's current row, aggregated into a JSON
+        object of key -> [str_value, int_value, float_value] (the float may be given
+        as text, if that is needed to keep its exact value). Return None if the
+        database can't do this, in which case the metadata is queried separately."""
+        return None
+
     def param(self, idx: int) -> pypika.Parameter:
         """Return a PyPika Parameter object for the given index"""
         return pypika.Parameter(self.parameter_format().format(idx))
@@ -21,6 +21,18 @@ from threading import local
 from importlib_resources import files
 from importlib_resources.abc import Traversable
 
+# Correlated subquery aggregating a parent's metadata into a single JSON object, see
+# SqlDB.metadata_json_sql. SQLite's JSON rendering of REALs only keeps 15 significant
+# digits, so the floats are passed as text which parses back to the exact same value.
+_METADATA_JSON_SQL = (
+    "(SELECT json_group_object(m.key, json_array(m.str_value, m.int_value, "
+    "CASE WHEN m.float_value IS NULL THEN NULL "
+    "ELSE printf('%!.20e', m.float_value) END)) "
+    "FROM {table} AS m WHERE m.{id_col} = {parent}.id)"
+)
+# SQLite has the JSON functions built in from 3.38, before that they are optional
+_METADATA_JSON_PROBE = "SELECT json_group_object('key', json_array(NULL, 1, 'x'))"
+
 
 class TxWrapper(base.TxWrapper):
     _conn: Connection
@@ -63,6 +75,8 @@ class SqliteDB(MigratableDB, SqlEmbeddingsQueue, SqlSysDB):
     _db_file: str
     _tx_stack: local
     _is_persistent: bool
+    # Whether the JSON functions are available, None until checked
+    _json_functions: Optional[bool]
 
     def __init__(self, system: System):
         self._settings = system.settings
@@ -86,8 +100,11 @@ class SqliteDB(MigratableDB, SqlEmbeddingsQueue, SqlSysDB):
             )
             if not os.path.exists(self._db_file):
                 os.makedirs(os.path.dirname(self._db_file), exist_ok=True)
-            self._conn_pool = PerThreadPool(self._db_file)
+            self._conn_pool = PerThreadPool(
+                self._db_file, wal=self._settings.require("sqlite_wal")
+            )
         self._tx_stack = local()
+        self._json_functions = None
         super().__init__(system)
 
     @trace_method("SqliteDB.start", OpenTelemetryGranularity.ALL)
@@ -246,3 +263,24 @@ class SqliteDB(MigratableDB, SqlEmbeddingsQueue, SqlSysDB):
     @override
     def unique_constraint_error() -> Type[BaseException]:
         return sqlite3.IntegrityError
+
+    @override
+    def metadata_json_sql(self, table: str, id_col: str, parent: str) -> Optional[str]:
+        if self._json_functions is None:
+            self._json_functions = self._has_json_functions()
+        if not self._json_functions:
+            return None
+        return _METADATA_JSON_SQL.format(table=table, id_col=id_col, parent=parent)
+
+    def _has_json_functions(self) -> bool:
+        """Whether this SQLite has the JSON functions. Only a missing function means
+        it doesn't, any other error is raised."""
+        with self.tx() as cur:
+            try:
+                cur.execute(_METADATA_JSON_PROBE)
+                cur.fetchall()
+            except sqlite3.OperationalError as e:
+                if "no such function" not in str(e):
+                    raise
+                return False
+        return True
@@ -4,6 +4,8 @@ from typing import Any, Set
 import threading
 from overrides import override
 
+_CACHED_STATEMENTS = 256
+
 
 class Connection:
     """A threadpool connection that returns itself to the pool on close()"""
@@ -13,14 +15,35 @@ class Connection:
     _conn: sqlite3.Connection
 
     def __init__(
-        self, pool: "Pool", db_file: str, is_uri: bool, *args: Any, **kwargs: Any
+        self,
+        pool: "Pool",
+        db_file: str,
+        is_uri: bool,
+        wal: bool,
+        *args: Any,
+        **kwargs: Any,
     ):
         self._pool = pool
         self._db_file = db_file
+        # sqlite3 keeps an LRU cache of prepared statements per connection; make it
+        # large enough to hold all the statements the sysdb and segments issue
+        kwargs.setdefault("cached_statements", _CACHED_STATEMENTS)
         self._conn = sqlite3.connect(
             db_file, timeout=1000, check_same_thread=False, uri=is_uri, *args, **kwargs
         )  # type: ignore
         self._conn.isolation_level = None  # Handle commits explicitly
+        if wal:
+            # WAL lets readers on other connections proceed while one connection
+            # writes (in-memory databases ignore it). Opt-in through the sqlite_wal
+            # setting, as the journal mode is persistent: it is stored in the database
+            # file, which then has -wal and -shm files next to it, and WAL does not
+            # work on network filesystems. With WAL, synchronous=NORMAL is still safe
+            # from corruption and avoids an fsync on every commit, but the most recent
+            # commits may be rolled back after a power loss or OS crash (not after an
+            # application crash).
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
 
     def execute(self, sql: str, parameters=...) -> sqlite3.Cursor:  # type: ignore
         if parameters is ...:
@@ -45,7 +68,7 @@ class Pool(ABC):
     """Abstract base class for a pool of connections to a sqlite database."""
 
     @abstractmethod
-    def __init__(self, db_file: str, is_uri: bool) -> None:
+    def __init__(self, db_file: str, is_uri: bool, wal: bool) -> None:
         pass
 
     @abstractmethod
@@ -75,13 +98,15 @@ class LockPool(Pool):
     _connection: threading.local
     _db_file: str
     _is_uri: bool
+    _wal: bool
 
-    def __init__(self, db_file: str, is_uri: bool = False):
+    def __init__(self, db_file: str, is_uri: bool = False, wal: bool = False):
         self._connections = set()
         self._connection = threading.local()
         self._lock = threading.RLock()
         self._db_file = db_file
         self._is_uri = is_uri
+        self._wal = wal
 
     @override
     def connect(self, *args: Any, **kwargs: Any) -> Connection:
@@ -90,7 +115,7 @@ class LockPool(Pool):
             return self._connection.conn  # type: ignore # cast doesn't work here for some reason
         else:
             new_connection = Connection(
-                self, self._db_file, self._is_uri, *args, **kwargs
+                self, self._db_file, self._is_uri, self._wal, *args, **kwargs
             )
             self._connection.conn = new_connection
             self._connections.add(new_connection)
@@ -125,13 +150,15 @@ class PerThreadPool(Pool):
     _connection: threading.local
     _db_file: str
     _is_uri_: bool
+    _wal: bool
 
-    def __init__(self, db_file: str, is_uri: bool = False):
+    def __init__(self, db_file: str, is_uri: bool = False, wal: bool = False):
         self._connections = set()
         self._connection = threading.local()
         self._lock = threading.Lock()
         self._db_file = db_file
         self._is_uri = is_uri
+        self._wal = wal
 
     @override
     def connect(self, *args: Any, **kwargs: Any) -> Connection:
@@ -139,7 +166,7 @@ class PerThreadPool(Pool):
             return self._connection.conn  # type: ignore # cast doesn't work here for some reason
         else:
             new_connection = Connection(
-                self, self._db_file, self._is_uri, *args, **kwargs
+                self, self._db_file, self._is_uri, self._wal, *args, **kwargs
             )
             self._connection.conn = new_connection
             with self._lock:
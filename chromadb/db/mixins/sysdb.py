@@ -1,8 +1,23 @@
-from typing import Optional, Sequence, Any, Tuple, cast, Dict, Union, Set
+import json
+from typing import (
+    Optional,
+    Sequence,
+    Any,
+    Tuple,
+    cast,
+    Dict,
+    List,
+    Union,
+    Set,
+    Callable,
+    Hashable,
+    Type,
+)
 from uuid import UUID
 from overrides import override
+import pypika
 from pypika import Table, Column
-from itertools import groupby
+from pypika.terms import LiteralValue
 
 from chromadb.config import DEFAULT_DATABASE, DEFAULT_TENANT, System
 from chromadb.db.base import (
@@ -10,6 +25,7 @@ from chromadb.db.base import (
     SqlDB,
     ParameterValue,
     get_sql,
+    iter_rows,
     NotFoundError,
     UniqueConstraintError,
 )
@@ -33,16 +49,95 @@ from chromadb.types import (
     UpdateMetadata,
 )
 
+# SQLite versions before 3.32 allow at most 999 bound parameters per statement. The
+# batches are padded to a power of two (see _metadata_by_id), so this is one as well.
+_MAX_IDS_PER_QUERY = 512
+
+# Looking the scope up directly is much cheaper than calling the Enum per row
+_SEGMENT_SCOPES = {scope.value: scope for scope in SegmentScope}
+
+# The (str_value, int_value, float_value) columns for a metadata value, by its exact
+# type, so that the common case is a single dict lookup. bools are stored as ints.
+_METADATA_COLUMNS: Dict[type, Callable[[Any], Tuple[Any, Any, Any]]] = {
+    str: lambda v: (v, None, None),
+    int: lambda v: (None, v, None),
+    bool: lambda v: (None, v, None),
+    float: lambda v: (None, None, v),
+}
+
+
+def _metadata_from_json(value: str) -> Optional[Metadata]:
+    """Parse the metadata aggregated by SqlDB.metadata_json_sql. Keys whose values
+    are all NULL are skipped and empty metadata is None, as for _metadata_by_id."""
+    metadata: Dict[str, Union[str, int, float]] = {}
+    for key, (str_value, int_value, float_value) in json.loads(value).items():
+        if str_value is not None:
+            metadata[key] = str_value
+        elif int_value is not None:
+            metadata[key] = int_value
+        elif float_value is not None:
+            metadata[key] = float(float_value)
+    return metadata or None
+
+
+# Statements which are the same on every call, so are written out rather than built
+# with pypika. Parameters are numbered {} fields, filled in with the database's
+# parameter format by SqlSysDB._render_sql, and paired with the names of the values
+# to bind to them.
+_CREATE_SEGMENT_SQL = (
+    "INSERT INTO segments (id, type, scope, topic, collection) "
+    "VALUES ({0}, {1}, {2}, {3}, {4})",
+    ("id", "type", "scope", "topic", "collection"),
+)
+_CREATE_COLLECTION_SQL = (
+    "INSERT INTO collections (id, topic, name, dimension, database_id) "
+    "VALUES ({0}, {1}, {2}, {3}, "
+    "(SELECT id FROM databases WHERE name = {4} AND tenant_id = {5}))",
+    ("id", "topic", "name", "dimension", "database", "tenant"),
+)
+_DELETE_SEGMENT_SQL = (
+    "DELETE FROM segments WHERE id = {0} RETURNING id",
+    ("id",),
+)
+_DELETE_COLLECTION_SQL = (
+    "DELETE FROM collections WHERE id = {0} AND database_id = "
+    "(SELECT id FROM databases WHERE name = {1} AND tenant_id = {2}) "
+    "RETURNING id, topic",
+    ("id", "database", "tenant"),
+)
+
 
 class SqlSysDB(SqlDB, SysDB):
+    """SysDB implementation on top of a SqlDB. The get_segments and get_collections
+    filters are applied in SQL and are backed by indexes (see the sysdb migrations), so
+    new filters should be added to the queries (with an index) rather than applied in
+    Python.
+
+    The hot statements are rendered once and cached in _sql_cache, so the same SQL text
+    is sent to the driver every time and its per-connection prepared statement cache
+    can reuse the compiled statement instead of parsing it again."""
+
     _assignment_policy: CollectionAssignmentPolicy
     # Used only to delete topics on collection deletion.
     # TODO: refactor to remove this dependency into a separate interface
     _producer: Producer
+    # Rendered SQL and parameter names, see _cached_sql()
+    _sql_cache: Dict[Hashable, Tuple[str, Tuple[Any, ...]]]
+    # Whether the database aggregates the metadata into the parent rows (see
+    # SqlDB.metadata_json_sql), checked in start()
+    _json_metadata: bool
+    # The results of the static parameter_format() and querybuilder(), which every
+    # query needs
+    _param_format: str
+    _query_builder: Type[pypika.Query]
 
     def __init__(self, system: System):
         self._assignment_policy = system.instance(CollectionAssignmentPolicy)
+        self._sql_cache = {}
+        self._json_metadata = False
         super().__init__(system)
+        self._param_format = self.parameter_format()
+        self._query_builder = self.querybuilder()
         self._opentelemetry_client = system.require(OpenTelemetryClient)
 
     @trace_method("SqlSysDB.create_segment", OpenTelemetryGranularity.ALL)
@@ -50,6 +145,10 @@ class SqlSysDB(SqlDB, SysDB):
     def start(self) -> None:
         super().start()
         self._producer = self._system.instance(Producer)
+        self._json_metadata = (
+            self.metadata_json_sql("segment_metadata", "segment_id", "segments")
+            is not None
+        )
 
     @override
     def create_database(
@@ -60,19 +159,19 @@ class SqlSysDB(SqlDB, SysDB):
             databases = Table("databases")
             tenants = Table("tenants")
             insert_database = (
-                self.querybuilder()
+                self._query_builder()
                 .into(databases)
                 .columns(databases.id, databases.name, databases.tenant_id)
                 .insert(
                     ParameterValue(self.uuid_to_db(id)),
                     ParameterValue(name),
-                    self.querybuilder()
+                    self._query_builder()
                     .select(tenants.id)
                     .from_(tenants)
                     .where(tenants.id == ParameterValue(tenant)),
                 )
             )
-            sql, params = get_sql(insert_database, self.parameter_format())
+            sql, params = get_sql(insert_database, self._param_format)
             try:
                 cur.execute(sql, params)
             except self.unique_constraint_error() as e:
@@ -85,13 +184,13 @@ class SqlSysDB(SqlDB, SysDB):
         with self.tx() as cur:
             databases = Table("databases")
             q = (
-                self.querybuilder()
+                self._query_builder()
                 .from_(databases)
                 .select(databases.id, databases.name)
                 .where(databases.name == ParameterValue(name))
                 .where(databases.tenant_id == ParameterValue(tenant))
             )
-            sql, params = get_sql(q, self.parameter_format())
+            sql, params = get_sql(q, self._param_format)
             row = cur.execute(sql, params).fetchone()
             if not row:
                 raise NotFoundError(f"Database {name} not found for tenant {tenant}")
@@ -109,12 +208,12 @@ class SqlSysDB(SqlDB, SysDB):
         with self.tx() as cur:
             tenants = Table("tenants")
             insert_tenant = (
-                self.querybuilder()
+                self._query_builder()
                 .into(tenants)
                 .columns(tenants.id)
                 .insert(ParameterValue(name))
             )
-            sql, params = get_sql(insert_tenant, self.parameter_format())
+            sql, params = get_sql(insert_tenant, self._param_format)
             try:
                 cur.execute(sql, params)
             except self.unique_constraint_error() as e:
@@ -125,12 +224,12 @@ class SqlSysDB(SqlDB, SysDB):
         with self.tx() as cur:
             tenants = Table("tenants")
             q = (
-                self.querybuilder()
+                self._query_builder()
                 .from_(tenants)
                 .select(tenants.id)
                 .where(tenants.id == ParameterValue(name))
             )
-            sql, params = get_sql(q, self.parameter_format())
+            sql, params = get_sql(q, self._param_format)
             row = cur.execute(sql, params).fetchone()
             if not row:
                 raise NotFoundError(f"Tenant {name} not found")
@@ -147,42 +246,55 @@ class SqlSysDB(SqlDB, SysDB):
                 "collection": str(segment["collection"]),
             }
         )
-        with self.tx() as cur:
-            segments = Table("segments")
-            insert_segment = (
-                self.querybuilder()
-                .into(segments)
-                .columns(
-                    segments.id,
-                    segments.type,
-                    segments.scope,
-                    segments.topic,
-                    segments.collection,
-                )
-                .insert(
-                    ParameterValue(self.uuid_to_db(segment["id"])),
-                    ParameterValue(segment["type"]),
-                    ParameterValue(segment["scope"].value),
-                    ParameterValue(segment["topic"]),
-                    ParameterValue(self.uuid_to_db(segment["collection"])),
+        self.create_segments([segment])
+
+    @trace_method("SqlSysDB.create_segments", OpenTelemetryGranularity.ALL)
+    @override
+    def create_segments(self, segments: Sequence[Segment]) -> None:
+        add_attributes_to_current_span(
+            {
+                "num_segments": len(segments),
+            }
+        )
+        if not segments:
+            return
+
+        # Bind the converter locally and convert each segment id only once, since
+        # both the segment row and its metadata rows need it
+        uuid_to_db = self.uuid_to_db
+        segment_rows = []
+        metadata_rows = []
+        for segment in segments:
+            sql_id = uuid_to_db(segment["id"])
+            segment_rows.append(
+                (
+                    sql_id,
+                    segment["type"],
+                    segment["scope"].value,
+                    segment["topic"],
+                    uuid_to_db(segment["collection"]),
                 )
             )
-            sql, params = get_sql(insert_segment, self.parameter_format())
+            if segment["metadata"]:
+                metadata_rows.extend(self._metadata_rows(sql_id, segment["metadata"]))
+
+        sql, _ = self._cached_sql(
+            "create_segment", lambda: self._render_sql(_CREATE_SEGMENT_SQL)
+        )
+        with self.tx() as cur:
             try:
-                cur.execute(sql, params)
+                cur.executemany(sql, segment_rows)
             except self.unique_constraint_error() as e:
-                raise UniqueConstraintError(
-                    f"Segment {segment['id']} already exists"
-                ) from e
+                if len(segments) == 1:
+                    message = f"Segment {segments[0]['id']} already exists"
+                else:
+                    ids = ", ".join(str(segment["id"]) for segment in segments)
+                    message = f"One of segments {ids} already exists"
+                raise UniqueConstraintError(message) from e
             metadata_t = Table("segment_metadata")
-            if segment["metadata"]:
-                self._insert_metadata(
-                    cur,
-                    metadata_t,
-                    metadata_t.segment_id,
-                    segment["id"],
-                    segment["metadata"],
-                )
+            self._insert_metadata_rows(
+                cur, metadata_t, metadata_t.segment_id, metadata_rows
+            )
 
     @trace_method("SqlSysDB.create_collection", OpenTelemetryGranularity.ALL)
     @override
@@ -235,34 +347,19 @@ class SqlSysDB(SqlDB, SysDB):
             database=database,
         )
 
+        sql, names = self._cached_sql(
+            "create_collection", lambda: self._render_sql(_CREATE_COLLECTION_SQL)
+        )
+        values = {
+            "id": self.uuid_to_db(collection["id"]),
+            "topic": collection["topic"],
+            "name": collection["name"],
+            "dimension": collection["dimension"],
+            "database": database,
+            "tenant": tenant,
+        }
+        params = tuple(values[name] for name in names)
         with self.tx() as cur:
-            collections = Table("collections")
-            databases = Table("databases")
-
-            insert_collection = (
-                self.querybuilder()
-                .into(collections)
-                .columns(
-                    collections.id,
-                    collections.topic,
-                    collections.name,
-                    collections.dimension,
-                    collections.database_id,
-                )
-                .insert(
-                    ParameterValue(self.uuid_to_db(collection["id"])),
-                    ParameterValue(collection["topic"]),
-                    ParameterValue(collection["name"]),
-                    ParameterValue(collection["dimension"]),
-                    # Get the database id for the database with the given name and tenant
-                    self.querybuilder()
-                    .select(databases.id)
-                    .from_(databases)
-                    .where(databases.name == ParameterValue(database))
-                    .where(databases.tenant_id == ParameterValue(tenant)),
-                )
-            )
-            sql, params = get_sql(insert_collection, self.parameter_format())
             try:
                 cur.execute(sql, params)
             except self.unique_constraint_error() as e:
@@ -299,64 +396,51 @@ class SqlSysDB(SqlDB, SysDB):
                 "collection": str(collection),
             }
         )
-        segments_t = Table("segments")
+        values = {
+            "id": self.uuid_to_db(id) if id else None,
+            "type": type,
+            "scope": scope.value if scope else None,
+            "topic": topic,
+            "collection": self.uuid_to_db(collection) if collection else None,
+        }
+        filters = tuple(k for k, v in values.items() if v)
         metadata_t = Table("segment_metadata")
-        q = (
-            self.querybuilder()
-            .from_(segments_t)
-            .select(
-                segments_t.id,
-                segments_t.type,
-                segments_t.scope,
-                segments_t.topic,
-                segments_t.collection,
-                metadata_t.key,
-                metadata_t.str_value,
-                metadata_t.int_value,
-                metadata_t.float_value,
-            )
-            .left_join(metadata_t)
-            .on(segments_t.id == metadata_t.segment_id)
-            .orderby(segments_t.id)
-        )
-        if id:
-            q = q.where(segments_t.id == ParameterValue(self.uuid_to_db(id)))
-        if type:
-            q = q.where(segments_t.type == ParameterValue(type))
-        if scope:
-            q = q.where(segments_t.scope == ParameterValue(scope.value))
-        if topic:
-            q = q.where(segments_t.topic == ParameterValue(topic))
-        if collection:
-            q = q.where(
-                segments_t.collection == ParameterValue(self.uuid_to_db(collection))
-            )
 
         with self.tx() as cur:
-            sql, params = get_sql(q, self.parameter_format())
-            rows = cur.execute(sql, params).fetchall()
-            by_segment = groupby(rows, lambda r: cast(object, r[0]))
-            segments = []
-            for segment_id, segment_rows in by_segment:
-                id = self.uuid_from_db(str(segment_id))
-                rows = list(segment_rows)
-                type = str(rows[0][1])
-                scope = SegmentScope(str(rows[0][2]))
-                topic = str(rows[0][3]) if rows[0][3] else None
-                collection = self.uuid_from_db(rows[0][4]) if rows[0][4] else None
-                metadata = self._metadata_from_rows(rows)
-                segments.append(
-                    Segment(
-                        id=cast(UUID, id),
-                        type=type,
-                        scope=scope,
-                        topic=topic,
-                        collection=collection,
-                        metadata=metadata,
-                    )
+            json_metadata = self._json_metadata
+            sql, names = self._cached_sql(
+                ("get_segments", filters, json_metadata),
+                lambda: self._get_segments_sql(filters, json_metadata),
+            )
+            params = tuple(values[name] for name in names)
+
+            # Build the segments as the rows stream in, keyed by their DB formatted id
+            # so the metadata can be attached afterwards if it wasn't aggregated into
+            # the rows. The driver already returns str values, only the ids need
+            # converting.
+            uuid_from_db = self.uuid_from_db
+            segments: Dict[Any, Segment] = {}
+            cur.execute(sql, params)
+            rows = iter_rows(cur)
+            for sql_id, seg_type, scope_value, seg_topic, collection_id, meta in rows:
+                segments[sql_id] = Segment(
+                    id=cast(UUID, uuid_from_db(sql_id)),
+                    type=seg_type,
+                    scope=_SEGMENT_SCOPES[scope_value],
+                    topic=seg_topic if seg_topic else None,
+                    collection=uuid_from_db(collection_id) if collection_id else None,
+                    metadata=_metadata_from_json(meta) if meta else None,
                 )
+            if json_metadata or not segments:
+                return list(segments.values())
+
+            metadata_by_id = self._metadata_by_id(
+                cur, metadata_t, metadata_t.segment_id, list(segments)
+            )
+            for sql_id, metadata in metadata_by_id.items():
+                segments[sql_id]["metadata"] = metadata
 
-            return segments
+            return list(segments.values())
 
     @trace_method("SqlSysDB.get_collections", OpenTelemetryGranularity.ALL)
     @override
@@ -383,75 +467,55 @@ class SqlSysDB(SqlDB, SysDB):
             }
         )
 
-        collections_t = Table("collections")
-        metadata_t = Table("collection_metadata")
-        databases_t = Table("databases")
-        q = (
-            self.querybuilder()
-            .from_(collections_t)
-            .select(
-                collections_t.id,
-                collections_t.name,
-                collections_t.topic,
-                collections_t.dimension,
-                databases_t.name,
-                databases_t.tenant_id,
-                metadata_t.key,
-                metadata_t.str_value,
-                metadata_t.int_value,
-                metadata_t.float_value,
-            )
-            .left_join(metadata_t)
-            .on(collections_t.id == metadata_t.collection_id)
-            .left_join(databases_t)
-            .on(collections_t.database_id == databases_t.id)
-            .orderby(collections_t.id)
-        )
-        if id:
-            q = q.where(collections_t.id == ParameterValue(self.uuid_to_db(id)))
-        if topic:
-            q = q.where(collections_t.topic == ParameterValue(topic))
-        if name:
-            q = q.where(collections_t.name == ParameterValue(name))
-
+        values = {
+            "id": self.uuid_to_db(id) if id else None,
+            "topic": topic,
+            "name": name,
+        }
         # Only if we have a name, tenant and database do we need to filter databases
         # Given an id, we can uniquely identify the collection so we don't need to filter databases
         if id is None and tenant and database:
-            databases_t = Table("databases")
-            q = q.where(
-                collections_t.database_id
-                == self.querybuilder()
-                .select(databases_t.id)
-                .from_(databases_t)
-                .where(databases_t.name == ParameterValue(database))
-                .where(databases_t.tenant_id == ParameterValue(tenant))
-            )
+            values["database"] = database
+            values["tenant"] = tenant
+        filters = tuple(k for k, v in values.items() if v)
+        metadata_t = Table("collection_metadata")
 
         with self.tx() as cur:
-            sql, params = get_sql(q, self.parameter_format())
-            rows = cur.execute(sql, params).fetchall()
-            by_collection = groupby(rows, lambda r: cast(object, r[0]))
-            collections = []
-            for collection_id, collection_rows in by_collection:
-                id = self.uuid_from_db(str(collection_id))
-                rows = list(collection_rows)
-                name = str(rows[0][1])
-                topic = str(rows[0][2])
-                dimension = int(rows[0][3]) if rows[0][3] else None
-                metadata = self._metadata_from_rows(rows)
-                collections.append(
-                    Collection(
-                        id=cast(UUID, id),
-                        topic=topic,
-                        name=name,
-                        metadata=metadata,
-                        dimension=dimension,
-                        tenant=str(rows[0][5]),
-                        database=str(rows[0][4]),
-                    )
+            json_metadata = self._json_metadata
+            sql, names = self._cached_sql(
+                ("get_collections", filters, json_metadata),
+                lambda: self._get_collections_sql(filters, json_metadata),
+            )
+            params = tuple(values[name] for name in names)
+
+            # Build the collections as the rows stream in, keyed by their DB formatted
+            # id so the metadata can be attached afterwards if it wasn't aggregated
+            # into the rows. The driver already returns str and int values, only the
+            # ids need converting.
+            uuid_from_db = self.uuid_from_db
+            collections: Dict[Any, Collection] = {}
+            cur.execute(sql, params)
+            rows = iter_rows(cur)
+            for sql_id, col_name, col_topic, dim, db_name, tenant_id, meta in rows:
+                collections[sql_id] = Collection(
+                    id=cast(UUID, uuid_from_db(sql_id)),
+                    topic=col_topic,
+                    name=col_name,
+                    metadata=_metadata_from_json(meta) if meta else None,
+                    dimension=dim if dim else None,
+                    tenant=tenant_id,
+                    database=db_name,
                 )
+            if json_metadata or not collections:
+                return list(collections.values())
+
+            metadata_by_id = self._metadata_by_id(
+                cur, metadata_t, metadata_t.collection_id, list(collections)
+            )
+            for sql_id, metadata in metadata_by_id.items():
+                collections[sql_id]["metadata"] = metadata
 
-            return collections
+            return list(collections.values())
 
     @trace_method("SqlSysDB.delete_segment", OpenTelemetryGranularity.ALL)
     @override
@@ -462,18 +526,12 @@ class SqlSysDB(SqlDB, SysDB):
                 "segment_id": str(id),
             }
         )
-        t = Table("segments")
-        q = (
-            self.querybuilder()
-            .from_(t)
-            .where(t.id == ParameterValue(self.uuid_to_db(id)))
-            .delete()
+        sql, _ = self._cached_sql(
+            "delete_segment", lambda: self._render_sql(_DELETE_SEGMENT_SQL)
         )
         with self.tx() as cur:
             # no need for explicit del from metadata table because of ON DELETE CASCADE
-            sql, params = get_sql(q, self.parameter_format())
-            sql = sql + " RETURNING id"
-            result = cur.execute(sql, params).fetchone()
+            result = cur.execute(sql, (self.uuid_to_db(id),)).fetchone()
             if not result:
                 raise NotFoundError(f"Segment {id} not found")
 
@@ -491,26 +549,13 @@ class SqlSysDB(SqlDB, SysDB):
                 "collection_id": str(id),
             }
         )
-        t = Table("collections")
-        databases_t = Table("databases")
-        q = (
-            self.querybuilder()
-            .from_(t)
-            .where(t.id == ParameterValue(self.uuid_to_db(id)))
-            .where(
-                t.database_id
-                == self.querybuilder()
-                .select(databases_t.id)
-                .from_(databases_t)
-                .where(databases_t.name == ParameterValue(database))
-                .where(databases_t.tenant_id == ParameterValue(tenant))
-            )
-            .delete()
+        sql, names = self._cached_sql(
+            "delete_collection", lambda: self._render_sql(_DELETE_COLLECTION_SQL)
         )
+        values = {"id": self.uuid_to_db(id), "database": database, "tenant": tenant}
+        params = tuple(values[name] for name in names)
         with self.tx() as cur:
             # no need for explicit del from metadata table because of ON DELETE CASCADE
-            sql, params = get_sql(q, self.parameter_format())
-            sql = sql + " RETURNING id, topic"
             result = cur.execute(sql, params).fetchone()
             if not result:
                 raise NotFoundError(f"Collection {id} not found")
@@ -535,7 +580,7 @@ class SqlSysDB(SqlDB, SysDB):
         metadata_t = Table("segment_metadata")
 
         q = (
-            self.querybuilder()
+            self._query_builder()
             .update(segments_t)
             .where(segments_t.id == ParameterValue(self.uuid_to_db(id)))
         )
@@ -550,18 +595,18 @@ class SqlSysDB(SqlDB, SysDB):
             )
 
         with self.tx() as cur:
-            sql, params = get_sql(q, self.parameter_format())
+            sql, params = get_sql(q, self._param_format)
             if sql:  # pypika emits a blank string if nothing to do
                 cur.execute(sql, params)
 
             if metadata is None:
                 q = (
-                    self.querybuilder()
+                    self._query_builder()
                     .from_(metadata_t)
                     .where(metadata_t.segment_id == ParameterValue(self.uuid_to_db(id)))
                     .delete()
                 )
-                sql, params = get_sql(q, self.parameter_format())
+                sql, params = get_sql(q, self._param_format)
                 cur.execute(sql, params)
             elif metadata != Unspecified():
                 metadata = cast(UpdateMetadata, metadata)
@@ -594,7 +639,7 @@ class SqlSysDB(SqlDB, SysDB):
         metadata_t = Table("collection_metadata")
 
         q = (
-            self.querybuilder()
+            self._query_builder()
             .update(collections_t)
             .where(collections_t.id == ParameterValue(self.uuid_to_db(id)))
         )
@@ -609,7 +654,7 @@ class SqlSysDB(SqlDB, SysDB):
             q = q.set(collections_t.dimension, ParameterValue(dimension))
 
         with self.tx() as cur:
-            sql, params = get_sql(q, self.parameter_format())
+            sql, params = get_sql(q, self._param_format)
             if sql:  # pypika emits a blank string if nothing to do
                 sql = sql + " RETURNING id"
                 result = cur.execute(sql, params)
@@ -622,14 +667,14 @@ class SqlSysDB(SqlDB, SysDB):
             # For now, follow current legancy semantics where metadata is fully reset
             if metadata != Unspecified():
                 q = (
-                    self.querybuilder()
+                    self._query_builder()
                     .from_(metadata_t)
                     .where(
                         metadata_t.collection_id == ParameterValue(self.uuid_to_db(id))
                     )
                     .delete()
                 )
-                sql, params = get_sql(q, self.parameter_format())
+                sql, params = get_sql(q, self._param_format)
                 cur.execute(sql, params)
                 if metadata is not None:
                     metadata = cast(UpdateMetadata, metadata)
@@ -642,27 +687,149 @@ class SqlSysDB(SqlDB, SysDB):
                         set(metadata.keys()),
                     )
 
-    @trace_method("SqlSysDB._metadata_from_rows", OpenTelemetryGranularity.ALL)
-    def _metadata_from_rows(
-        self, rows: Sequence[Tuple[Any, ...]]
-    ) -> Optional[Metadata]:
-        """Given SQL rows, return a metadata map (assuming that the last four columns
-        are the key, str_value, int_value & float_value)"""
+    def _cached_sql(
+        self, key: Hashable, build: Callable[[], Tuple[str, Tuple[Any, ...]]]
+    ) -> Tuple[str, Tuple[Any, ...]]:
+        """Return the SQL and parameter names for a query, calling build() to render
+        them only the first time the key is seen. Queries which differ only in their
+        parameter values should share a key, so that rebuilding and rendering the
+        pypika query is not repeated for every call."""
+        cached = self._sql_cache.get(key)
+        if cached is None:
+            cached = build()
+            self._sql_cache[key] = cached
+        return cached
+
+    def _metadata_json_column(
+        self, json_metadata: bool, table: str, id_col: str, parent: str
+    ) -> LiteralValue:
+        """The column with the parent's aggregated metadata, or NULL if the metadata
+        is to be read separately with _metadata_by_id"""
+        sql = self.metadata_json_sql(table, id_col, parent) if json_metadata else None
+        return LiteralValue(sql if sql is not None else "NULL")
+
+    def _get_segments_sql(
+        self, filters: Tuple[str, ...], json_metadata: bool
+    ) -> Tuple[str, Tuple[Any, ...]]:
+        """Render the get_segments query, filtering on each of the named columns. The
+        parameters are the names of the filtered columns."""
+        segments_t = Table("segments")
+        q = (
+            self._query_builder()
+            .from_(segments_t)
+            .select(
+                segments_t.id,
+                segments_t.type,
+                segments_t.scope,
+                segments_t.topic,
+                segments_t.collection,
+                self._metadata_json_column(
+                    json_metadata, "segment_metadata", "segment_id", "segments"
+                ),
+            )
+            .orderby(segments_t.id)
+        )
+        for column in filters:
+            q = q.where(segments_t.field(column) == ParameterValue(column))
+        return get_sql(q, self._param_format)
+
+    def _get_collections_sql(
+        self, filters: Tuple[str, ...], json_metadata: bool
+    ) -> Tuple[str, Tuple[Any, ...]]:
+        """Render the get_collections query, filtering on each of the named columns
+        (or on the database, if "database" and "tenant" are given). The parameters are
+        the names of the filters."""
+        collections_t = Table("collections")
+        databases_t = Table("databases")
+        q = (
+            self._query_builder()
+            .from_(collections_t)
+            .select(
+                collections_t.id,
+                collections_t.name,
+                collections_t.topic,
+                collections_t.dimension,
+                databases_t.name,
+                databases_t.tenant_id,
+                self._metadata_json_column(
+                    json_metadata, "collection_metadata", "collection_id", "collections"
+                ),
+            )
+            .left_join(databases_t)
+            .on(collections_t.database_id == databases_t.id)
+            .orderby(collections_t.id)
+        )
+        for column in ("id", "topic", "name"):
+            if column in filters:
+                q = q.where(collections_t.field(column) == ParameterValue(column))
+        if "database" in filters:
+            q = q.where(
+                collections_t.database_id
+                == self._query_builder()
+                .select(databases_t.id)
+                .from_(databases_t)
+                .where(databases_t.name == ParameterValue("database"))
+                .where(databases_t.tenant_id == ParameterValue("tenant"))
+            )
+        return get_sql(q, self._param_format)
+
+    def _render_sql(
+        self, statement: Tuple[str, Tuple[str, ...]]
+    ) -> Tuple[str, Tuple[Any, ...]]:
+        """Render one of the module's fixed SQL statements with this database's
+        parameter format, returning the SQL and the names of its parameters"""
+        template, names = statement
+        formatstr = self._param_format
+        placeholders = (formatstr.format(i) for i in range(1, len(names) + 1))
+        return template.format(*placeholders), names
+
+    @trace_method("SqlSysDB._metadata_by_id", OpenTelemetryGranularity.ALL)
+    def _metadata_by_id(
+        self, cur: Cursor, table: Table, id_col: Column, ids: Sequence[Any]
+    ) -> Dict[Any, Metadata]:
+        """Fetch the metadata for the given (DB formatted) ids, returning a map from id
+        to metadata. Ids without any metadata are omitted. The ids are queried in
+        batches to stay below the database's limit on the number of bound parameters."""
         add_attributes_to_current_span(
             {
-                "num_rows": len(rows),
+                "num_ids": len(ids),
             }
         )
-        metadata: Dict[str, Union[str, int, float]] = {}
-        for row in rows:
-            key = str(row[-4])
-            if row[-3] is not None:
-                metadata[key] = str(row[-3])
-            elif row[-2] is not None:
-                metadata[key] = int(row[-2])
-            elif row[-1] is not None:
-                metadata[key] = float(row[-1])
-        return metadata or None
+        metadata_by_id: Dict[Any, Dict[str, Union[str, int, float]]] = {}
+        for i in range(0, len(ids), _MAX_IDS_PER_QUERY):
+            batch = ids[i : i + _MAX_IDS_PER_QUERY]
+            # Pad the batch with NULLs (which never match) up to a power of two, so at
+            # most a handful of distinct statements reach the driver's statement cache
+            size = 1 << (len(batch) - 1).bit_length()
+            params = tuple(batch) + (None,) * (size - len(batch))
+            sql, _ = self._cached_sql(
+                ("metadata_by_id", table.get_table_name(), size),
+                lambda: (
+                    f"SELECT {id_col.name}, key, str_value, int_value, float_value "
+                    f"FROM {table.get_table_name()} "
+                    f"WHERE {id_col.name} IN ({self._placeholders(size)})",
+                    (),
+                ),
+            )
+            cur.execute(sql, params)
+            # The driver already returns the values typed by their column, so they
+            # don't need converting. Check against None rather than truthiness so
+            # that "", 0 and 0.0 are kept.
+            for sql_id, key, str_value, int_value, float_value in iter_rows(cur):
+                value: Union[str, int, float]
+                if str_value is not None:
+                    value = str_value
+                elif int_value is not None:
+                    value = int_value
+                elif float_value is not None:
+                    value = float_value
+                else:
+                    continue
+                metadata = metadata_by_id.get(sql_id)
+                if metadata is None:
+                    metadata = metadata_by_id[sql_id] = {}
+                metadata[key] = value
+        return cast(Dict[Any, Metadata], metadata_by_id)
 
     @trace_method("SqlSysDB._insert_metadata", OpenTelemetryGranularity.ALL)
     def _insert_metadata(
@@ -684,55 +851,63 @@ class SqlSysDB(SqlDB, SysDB):
         )
         if clear_keys:
             q = (
-                self.querybuilder()
+                self._query_builder()
                 .from_(table)
                 .where(id_col == ParameterValue(self.uuid_to_db(id)))
                 .where(table.key.isin([ParameterValue(k) for k in clear_keys]))
                 .delete()
             )
-            sql, params = get_sql(q, self.parameter_format())
+            sql, params = get_sql(q, self._param_format)
             cur.execute(sql, params)
 
-        q = (
-            self.querybuilder()
-            .into(table)
-            .columns(
-                id_col,
-                table.key,
-                table.str_value,
-                table.int_value,
-                table.float_value,
-            )
+        self._insert_metadata_rows(
+            cur, table, id_col, self._metadata_rows(self.uuid_to_db(id), metadata)
         )
-        sql_id = self.uuid_to_db(id)
+
+    def _metadata_rows(
+        self, sql_id: Any, metadata: UpdateMetadata
+    ) -> List[Tuple[Any, ...]]:
+        """Return the parameter rows (id, key, str_value, int_value, float_value) to
+        insert for the given metadata, for the (DB formatted) id. Keys with None values
+        are skipped."""
+        rows: List[Tuple[Any, ...]] = []
         for k, v in metadata.items():
-            if isinstance(v, str):
-                q = q.insert(
-                    ParameterValue(sql_id),
-                    ParameterValue(k),
-                    ParameterValue(v),
-                    None,
-                    None,
-                )
-            elif isinstance(v, int):
-                q = q.insert(
-                    ParameterValue(sql_id),
-                    ParameterValue(k),
-                    None,
-                    ParameterValue(v),
-                    None,
-                )
-            elif isinstance(v, float):
-                q = q.insert(
-                    ParameterValue(sql_id),
-                    ParameterValue(k),
-                    None,
-                    None,
-                    ParameterValue(v),
-                )
-            elif v is None:
-                continue
+            to_columns = _METADATA_COLUMNS.get(type(v))
+            if to_columns is None:
+                # Subclasses (e.g. numpy floats) and None
+                if isinstance(v, str):
+                    to_columns = _METADATA_COLUMNS[str]
+                elif isinstance(v, int):
+                    to_columns = _METADATA_COLUMNS[int]
+                elif isinstance(v, float):
+                    to_columns = _METADATA_COLUMNS[float]
+                else:
+                    continue
+            rows.append((sql_id, k, *to_columns(v)))
+        return rows
+
+    def _insert_metadata_rows(
+        self,
+        cur: Cursor,
+        table: Table,
+        id_col: Column,
+        rows: Sequence[Tuple[Any, ...]],
+    ) -> None:
+        """Insert rows built by _metadata_rows with a single executemany, rather than
+        growing a pypika query with one insert() per key."""
+        if not rows:
+            return
+        sql, _ = self._cached_sql(
+            ("insert_metadata", table.get_table_name()),
+            lambda: (
+                f"INSERT INTO {table.get_table_name()} "
+                f"({id_col.name}, key, str_value, int_value, float_value) "
+                f"VALUES ({self._placeholders(5)})",
+                (),
+            ),
+        )
+        cur.executemany(sql, rows)
 
-        sql, params = get_sql(q, self.parameter_format())
-        if sql:
-            cur.execute(sql, params)
+    def _placeholders(self, n: int) -> str:
+        """Return a comma separated list of n parameter placeholders"""
+        return ", ".join(self._param_format.format(i) for i in range(1, n + 1))
@@ -49,6 +49,13 @@ class SysDB(Component):
         already exists."""
         pass
 
+    def create_segments(self, segments: Sequence[Segment]) -> None:
+        """Create several new segments in the System database. Raises an Error if any
+        of the IDs already exist. Implementations may override this to create all the
+        segments in a single transaction."""
+        for segment in segments:
+            self.create_segment(segment)
+
     @abstractmethod
     def delete_segment(self, id: UUID) -> None:
         """Create a new segment in the System database."""
@@ -0,0 +1,8 @@
+-- Indexes for the filters used by SqlSysDB.get_segments and get_collections.
+-- segment_metadata and collection_metadata need none: their primary keys lead with
+-- the parent id, which already serves the metadata lookups.
+CREATE INDEX IF NOT EXISTS idx_segments_collection_scope ON segments (collection, scope);
+CREATE INDEX IF NOT EXISTS idx_segments_type ON segments (type);
+CREATE INDEX IF NOT EXISTS idx_segments_topic ON segments (topic);
+CREATE INDEX IF NOT EXISTS idx_collections_topic ON collections (topic);
+CREATE INDEX IF NOT EXISTS idx_collections_database_id ON collections (database_id);
@@ -1,5 +1,7 @@
-from chromadb.db.base import ParameterValue, get_sql
+from typing import cast
+from chromadb.db.base import Cursor, ParameterValue, get_sql, iter_rows
 import pypika
+import sqlite3
 
 
 def test_value_params_default() -> None:
@@ -40,3 +42,16 @@ def test_value_params_numeric() -> None:
     sql, values = get_sql(value_based_query, formatstr=":{}")
     assert sql == original_query.get_sql()
     assert values == (42, 43)
+
+
+def test_iter_rows() -> None:
+    conn = sqlite3.connect(":memory:")
+    cur = cast(Cursor, conn.cursor())
+    cur.execute("CREATE TABLE foo (a INTEGER)")
+    cur.executemany("INSERT INTO foo (a) VALUES (?)", [(i,) for i in range(10)])
+
+    cur.execute("SELECT a FROM foo ORDER BY a")
+    assert list(iter_rows(cur, batch_size=3)) == [(i,) for i in range(10)]
+
+    cur.execute("SELECT a FROM foo WHERE a > 100")
+    assert list(iter_rows(cur)) == []
@@ -1,7 +1,9 @@
 import os
+import sqlite3
 import shutil
 import tempfile
 import pytest
+from pathlib import Path
 from typing import Generator, List, Callable, Dict, Union
 
 from chromadb.db.impl.grpc.client import GrpcSysDB
@@ -138,6 +140,36 @@ def sysdb(request: FixtureRequest) -> Generator[SysDB, None, None]:
     yield next(request.param())
 
 
+@pytest.mark.parametrize(
+    "is_persistent, sqlite_wal, journal_mode",
+    [
+        (False, False, "memory"),
+        (False, True, "memory"),
+        (True, False, "delete"),
+        (True, True, "wal"),
+    ],
+)
+def test_sqlite_journal_mode(
+    tmp_path: Path, is_persistent: bool, sqlite_wal: bool, journal_mode: str
+) -> None:
+    db = SqliteDB(
+        System(
+            Settings(
+                is_persistent=is_persistent,
+                persist_directory=str(tmp_path),
+                sqlite_wal=sqlite_wal,
+                chroma_collection_assignment_policy_impl="chromadb.test.db.test_system.MockAssignmentPolicy",
+            )
+        )
+    )
+    db.start()
+    try:
+        with db.tx() as cur:
+            assert cur.execute("PRAGMA journal_mode").fetchone()[0] == journal_mode
+    finally:
+        db.stop()
+
+
 # region Collection tests
 def test_create_get_delete_collections(sysdb: SysDB) -> None:
     sysdb.reset_state()
@@ -256,6 +288,42 @@ def test_update_collections(sysdb: SysDB) -> None:
     assert result == [coll]
 
 
+def test_falsy_metadata_values(sysdb: SysDB) -> None:
+    sysdb.reset_state()
+    metadata: Dict[str, Union[str, int, float]] = {
+        "test_str": "",
+        "test_int": 0,
+        "test_float": 0.0,
+    }
+    coll = sample_collections[0]
+    sysdb.create_collection(id=coll["id"], name=coll["name"], metadata=metadata)
+    segment = Segment(
+        id=uuid.uuid4(),
+        type="test_type_a",
+        scope=SegmentScope.VECTOR,
+        topic=None,
+        collection=coll["id"],
+        metadata=metadata,
+    )
+    sysdb.create_segment(segment)
+
+    result = sysdb.get_collections(id=coll["id"])[0]["metadata"]
+    assert result == metadata
+    assert isinstance(result["test_float"], float)
+    assert sysdb.get_segments(id=segment["id"]) == [segment]
+
+    # bools are stored in the int column, and subclasses of the value types are
+    # stored like their base type
+    class Label(str):
+        pass
+
+    sysdb.update_collection(
+        id=coll["id"], metadata={"test_bool": True, "test_label": Label("x")}
+    )
+    result = sysdb.get_collections(id=coll["id"])[0]["metadata"]
+    assert result == {"test_bool": 1, "test_label": "x"}
+
+
 def test_get_or_create_collection(sysdb: SysDB) -> None:
     sysdb.reset_state()
 
@@ -700,6 +768,113 @@ def test_create_get_delete_segments(sysdb: SysDB) -> None:
         sysdb.delete_segment(s1["id"])
 
 
+def test_create_segments_batch(sysdb: SysDB) -> None:
+    sysdb.reset_state()
+
+    for collection in sample_collections:
+        sysdb.create_collection(
+            id=collection["id"],
+            name=collection["name"],
+            metadata=collection["metadata"],
+            dimension=collection["dimension"],
+        )
+
+    sysdb.create_segments(sample_segments)
+
+    results = sysdb.get_segments()
+    results = sorted(results, key=lambda c: c["id"])
+    assert results == sample_segments
+
+    # Duplicate create fails
+    with pytest.raises(UniqueConstraintError):
+        sysdb.create_segments(sample_segments[:1])
+
+    # Empty batch is a no-op
+    sysdb.create_segments([])
+    assert len(sysdb.get_segments()) == len(sample_segments)
+
+
+@pytest.mark.parametrize("json_metadata", [True, False])
+def test_get_many_segments_with_metadata(
+    sysdb: SysDB, json_metadata: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    if not json_metadata and not isinstance(sysdb, SqliteDB):
+        pytest.skip("Only SqliteDB has separate metadata read paths")
+    sysdb.reset_state()
+    if isinstance(sysdb, SqliteDB):
+        monkeypatch.setattr(sysdb, "_json_metadata", json_metadata)
+
+    # Enough segments that, without the JSON aggregation, their metadata can't be
+    # fetched in a single query (and the last batch has to be padded)
+    segments = [
+        Segment(
+            id=uuid.UUID(int=i),
+            type="test_type_a",
+            scope=SegmentScope.VECTOR,
+            topic=None,
+            collection=None,
+            metadata={"index": i} if i % 2 == 0 else None,
+        )
+        for i in range(1, 2001)
+    ]
+    sysdb.create_segments(segments)
+
+    results = sorted(sysdb.get_segments(), key=lambda s: s["id"])
+    assert results == segments
+
+
+def test_json_metadata_probe(sysdb: SysDB, monkeypatch: pytest.MonkeyPatch) -> None:
+    if not isinstance(sysdb, SqliteDB):
+        pytest.skip("Only SqliteDB aggregates the metadata into JSON")
+    assert sysdb.metadata_json_sql("segment_metadata", "segment_id", "segments")
+
+    # A missing JSON function falls back to the separate metadata queries, any other
+    # error is raised
+    monkeypatch.setattr(
+        "chromadb.db.impl.sqlite._METADATA_JSON_PROBE", "SELECT no_such_function()"
+    )
+    monkeypatch.setattr(sysdb, "_json_functions", None)
+    assert sysdb.metadata_json_sql("segment_metadata", "segment_id", "segments") is None
+    monkeypatch.setattr(
+        "chromadb.db.impl.sqlite._METADATA_JSON_PROBE", "SELECT * FROM no_such_table"
+    )
+    monkeypatch.setattr(sysdb, "_json_functions", None)
+    with pytest.raises(sqlite3.OperationalError):
+        sysdb.metadata_json_sql("segment_metadata", "segment_id", "segments")
+
+
+@pytest.mark.parametrize("json_metadata", [True, False])
+def test_metadata_read_paths(
+    sysdb: SysDB, json_metadata: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    if not isinstance(sysdb, SqliteDB):
+        pytest.skip("Only SqliteDB aggregates the metadata into JSON")
+    sysdb.reset_state()
+    monkeypatch.setattr(sysdb, "_json_metadata", json_metadata)
+
+    # Values which don't survive a naive trip through JSON
+    metadata: Dict[str, Union[str, int, float]] = {
+        "test_str": 'a "quoted" \\ string \u00fc',
+        "test_int": 2**62 + 1,
+        "test_float": 0.1 + 0.2,
+        "test_tiny_float": 5e-324,
+    }
+    coll = sample_collections[0]
+    sysdb.create_collection(id=coll["id"], name=coll["name"], metadata=metadata)
+    segment = Segment(
+        id=uuid.uuid4(),
+        type="test_type_a",
+        scope=SegmentScope.VECTOR,
+        topic=None,
+        collection=coll["id"],
+        metadata=metadata,
+    )
+    sysdb.create_segment(segment)
+
+    assert sysdb.get_collections(id=coll["id"])[0]["metadata"] == metadata
+    assert sysdb.get_segments(id=segment["id"]) == [segment]
+
+
 def test_update_segment(sysdb: SysDB) -> None:
     metadata: Dict[str, Union[str, int, float]] = {
         "test_str": "str1",
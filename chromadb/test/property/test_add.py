@@ -21,31 +21,34 @@ def test_add(
     collection: strategies.Collection,
     record_set: strategies.RecordSet,
 ) -> None:
-    api.reset()
-
+    # The api fixture starts each test from a clean state; rather than resetting the
+    # whole system for every example, drop the example's collection when it's done
     # TODO: Generative embedding functions
     coll = api.create_collection(
         name=collection.name,
         metadata=collection.metadata,  # type: ignore
         embedding_function=collection.embedding_function,
     )
-    normalized_record_set = invariants.wrap_all(record_set)
+    try:
+        normalized_record_set = invariants.wrap_all(record_set)
 
-    if not invariants.is_metadata_valid(normalized_record_set):
-        with pytest.raises(Exception):
-            coll.add(**normalized_record_set)
-        return
+        if not invariants.is_metadata_valid(normalized_record_set):
+            with pytest.raises(Exception):
+                coll.add(**normalized_record_set)
+            return
 
-    coll.add(**record_set)
+        coll.add(**record_set)
 
-    invariants.count(coll, cast(strategies.RecordSet, normalized_record_set))
-    n_results = max(1, (len(normalized_record_set["ids"]) // 10))
-    invariants.ann_accuracy(
-        coll,
-        cast(strategies.RecordSet, normalized_record_set),
-        n_results=n_results,
-        embedding_function=collection.embedding_function,
-    )
+        invariants.count(coll, cast(strategies.RecordSet, normalized_record_set))
+        n_results = max(1, (len(normalized_record_set["ids"]) // 10))
+        invariants.ann_accuracy(
+            coll,
+            cast(strategies.RecordSet, normalized_record_set),
+            n_results=n_results,
+            embedding_function=collection.embedding_function,
+        )
+    finally:
+        api.delete_collection(collection.name)
 
 
 def create_large_recordset(